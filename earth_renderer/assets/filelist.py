@@ -1,21 +1,25 @@
 import os
 
-def list_png_files(root_dir='.'):
+def iter_png_files(root_dir='.'):
     """
-    Lists all PNG files in the given directory and its subdirectories.
+    Yields all PNG files in the given directory and its subdirectories.
+
+    Uses os.scandir so the cached directory-entry type is reused instead of
+    issuing an extra stat() per file, and streams paths instead of building
+    an intermediate list.
 
     Args:
         root_dir (str): The path of the directory to start searching from. Defaults to '.'.
 
-    Returns:
-        list: A list of full paths of PNG file names.
+    Yields:
+        str: The full path of each PNG file found.
     """
-    png_files = []
-    for dirpath, _, filenames in os.walk(root_dir):
-        for filename in filenames:
-            if filename.endswith('.png'):
-                png_files.append(os.path.join(dirpath, filename))
-    return png_files
+    with os.scandir(root_dir) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_png_files(entry.path)
+            elif entry.name.endswith('.png'):
+                yield entry.path
 
-png_files = list_png_files()
-print(png_files)
\ No newline at end of file
+png_files = list(iter_png_files())
+print(png_files)
@@ -1,14 +1,25 @@
+import math
+
 import pygame
 import numpy as np
+from numba import njit, prange
 from pygame.locals import *
 
+# Optional GPU renderer: stream positions into a VBO and draw point sprites
+# instead of blitting N surfaces through SDL. Falls back to sprite blits.
+try:
+    import moderngl
+    HAVE_MODERNGL = True
+except ImportError:
+    HAVE_MODERNGL = False
+
 # Constants
 WINDOW_SIZE = (800, 600)
 BACKGROUND_COLOR = (30, 30, 30)
 PARTICLE_COLOR = (100, 100, 255)
 PARTICLE_RADIUS = 8
 NUM_PARTICLES = 100
-GRAVITY = np.array([0, 980.0])
+GRAVITY = np.array([0, 980.0], dtype=np.float32)
 DAMPING = 0.95
 SMOOTHING_RADIUS = 30
 PRESSURE_STIFFNESS = 0.08
@@ -16,168 +27,537 @@ VISCOSITY = 0.02
 REST_DENSITY = 300.0
 TIME_STEP = 0.016
 
-# Smoothing kernels
-def poly6_kernel(r, h):
-    return 315 / (64 * np.pi * h**9) * (h**2 - r**2)**3 if r < h else 0.0
+# Precomputed smoothing-kernel coefficients (h = SMOOTHING_RADIUS)
+H = float(SMOOTHING_RADIUS)
+H2 = H * H
+POLY6_COEF = 315.0 / (64.0 * math.pi * H**9)
+SPIKY_GRAD_COEF = -45.0 / (math.pi * H**6)
+VISC_LAP_COEF = 45.0 / (math.pi * H**6)
+
+# Verlet-list skin: pairs are gathered out to H + SKIN and the list is only
+# rebuilt once some particle has drifted more than half the skin since the
+# last build, so the grid traversal is amortized over many steps.
+SKIN = 0.3 * H
+
+# JIT-compiled SPH kernels. The neighbor walk over the CSR cell list happens
+# once per frame in build_pairs; the density and force passes then reuse the
+# cached pair distances instead of re-walking the grid.
+@njit(parallel=True, fastmath=True, cache=True)
+def build_pairs(pos, cell_keys, cell_start, sorted_idx, cell_size, h):
+    m = cell_keys.shape[0]
+    h2 = h * h
+
+    # Pass 1: count pairs per occupied cell (j > i so each pair appears once).
+    # Parallelizing over cells gives each thread a spatially coherent block
+    # of particles, and every particle belongs to exactly one cell so the
+    # per-cell output slices below stay disjoint.
+    counts = np.zeros(m, dtype=np.int32)
+    for b in prange(m):
+        c = 0
+        for s in range(cell_start[b], cell_start[b + 1]):
+            i = sorted_idx[s]
+            px = pos[i, 0]
+            py = pos[i, 1]
+            cx = int(px / cell_size)
+            cy = int(py / cell_size)
+            for ox in range(-1, 2):
+                for oy in range(-1, 2):
+                    key = ((cx + ox) << 32) | ((cy + oy) & 0xFFFFFFFF)
+                    c2 = np.searchsorted(cell_keys, key)
+                    if c2 >= m or cell_keys[c2] != key:
+                        continue
+                    for k in range(cell_start[c2], cell_start[c2 + 1]):
+                        j = sorted_idx[k]
+                        if j <= i:
+                            continue
+                        dx = pos[j, 0] - px
+                        dy = pos[j, 1] - py
+                        if dx * dx + dy * dy < h2:
+                            c += 1
+        counts[b] = c
+
+    offsets = np.empty(m + 1, dtype=np.int32)
+    offsets[0] = 0
+    for b in range(m):
+        offsets[b + 1] = offsets[b] + counts[b]
+    total = offsets[m]
+
+    pair_i = np.empty(total, dtype=np.int32)
+    pair_j = np.empty(total, dtype=np.int32)
+
+    # Pass 2: fill each cell's slice
+    for b in prange(m):
+        idx = offsets[b]
+        for s in range(cell_start[b], cell_start[b + 1]):
+            i = sorted_idx[s]
+            px = pos[i, 0]
+            py = pos[i, 1]
+            cx = int(px / cell_size)
+            cy = int(py / cell_size)
+            for ox in range(-1, 2):
+                for oy in range(-1, 2):
+                    key = ((cx + ox) << 32) | ((cy + oy) & 0xFFFFFFFF)
+                    c2 = np.searchsorted(cell_keys, key)
+                    if c2 >= m or cell_keys[c2] != key:
+                        continue
+                    for k in range(cell_start[c2], cell_start[c2 + 1]):
+                        j = sorted_idx[k]
+                        if j <= i:
+                            continue
+                        dx = pos[j, 0] - px
+                        dy = pos[j, 1] - py
+                        if dx * dx + dy * dy < h2:
+                            pair_i[idx] = i
+                            pair_j[idx] = j
+                            idx += 1
+    return pair_i, pair_j
 
-def spiky_gradient(r, h):
-    return -45 / (np.pi * h**6) * (h - r)**2 if r < h else 0.0
+@njit(parallel=True, fastmath=True, cache=True)
+def refresh_pairs(pos, pair_i, pair_j, pair_r, pair_dx, pair_dy):
+    # Recompute pair geometry from current positions; the index list itself
+    # persists across steps thanks to the Verlet skin
+    for k in prange(pair_i.shape[0]):
+        i = pair_i[k]
+        j = pair_j[k]
+        dx = pos[j, 0] - pos[i, 0]
+        dy = pos[j, 1] - pos[i, 1]
+        pair_dx[k] = dx
+        pair_dy[k] = dy
+        pair_r[k] = np.sqrt(dx * dx + dy * dy)
 
-def viscosity_laplacian(r, h):
-    return 45 / (np.pi * h**6) * (h - r) if r < h else 0.0
+@njit(fastmath=True, cache=True)
+def compute_density(density, pair_i, pair_j, pair_r, h, poly6_coef):
+    h2 = h * h
+    # Self-contribution (r = 0), then scatter each pair to both members.
+    # Pairs in the skin band (h <= r < h + SKIN) contribute nothing.
+    density[:] = poly6_coef * h2 * h2 * h2
+    for k in range(pair_i.shape[0]):
+        w = h2 - pair_r[k] * pair_r[k]
+        if w <= 0.0:
+            continue
+        w = poly6_coef * w * w * w
+        density[pair_i[k]] += w
+        density[pair_j[k]] += w
+
+@njit(fastmath=True, cache=True)
+def compute_forces(vel, density, pressure, acc, pair_i, pair_j, pair_r,
+                   pair_dx, pair_dy, h, spiky_coef, visc_coef, viscosity,
+                   gravity_y):
+    n = acc.shape[0]
+    acc[:] = 0.0
+    for k in range(pair_i.shape[0]):
+        i = pair_i[k]
+        j = pair_j[k]
+        r = pair_r[k]
+        if r == 0.0 or r >= h:
+            continue
+        dx = pair_dx[k]
+        dy = pair_dy[k]
+
+        # Pressure force (denominator differs per side, so compute both)
+        spiky = spiky_coef * (h - r) * (h - r)
+        shared_pressure = pressure[i] + pressure[j]
+        term_i = shared_pressure / (2 * density[j]) * spiky
+        term_j = shared_pressure / (2 * density[i]) * spiky
+        acc[i, 0] += -dx / r * term_i
+        acc[i, 1] += -dy / r * term_i
+        acc[j, 0] += dx / r * term_j
+        acc[j, 1] += dy / r * term_j
+
+        # Viscosity force
+        visc = viscosity * visc_coef * (h - r)
+        dvx = vel[j, 0] - vel[i, 0]
+        dvy = vel[j, 1] - vel[i, 1]
+        acc[i, 0] += visc / density[j] * dvx
+        acc[i, 1] += visc / density[j] * dvy
+        acc[j, 0] += visc / density[i] * -dvx
+        acc[j, 1] += visc / density[i] * -dvy
+
+    # External forces: gravity and friction, then F -> a
+    for i in range(n):
+        fx = acc[i, 0] - 0.1 * vel[i, 0] * density[i]
+        fy = acc[i, 1] + gravity_y * density[i] - 0.1 * vel[i, 1] * density[i]
+        acc[i, 0] = fx / density[i]
+        acc[i, 1] = fy / density[i]
+
+# Optional Cython fast path (built with `python setup.py build_ext --inplace`);
+# shadows the Numba pair kernels above when the extension is present.
+try:
+    from sph_core import refresh_pairs, compute_density, compute_forces
+except ImportError:
+    pass
+
+# Optional CUDA offload: one thread per particle gathering over the CSR cell
+# list, used automatically when a CUDA device is present. State lives on the
+# GPU for the whole step; only density/pressure/acc come back to the host.
+try:
+    from numba import cuda
+    USE_CUDA = cuda.is_available()
+except Exception:
+    USE_CUDA = False
+
+if USE_CUDA:
+    @cuda.jit(device=True)
+    def _gpu_find_cell(cell_keys, key):
+        lo = 0
+        hi = cell_keys.shape[0]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if cell_keys[mid] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < cell_keys.shape[0] and cell_keys[lo] == key:
+            return lo
+        return -1
+
+    @cuda.jit
+    def gpu_density(pos, density, pressure, cell_keys, cell_start, sorted_idx,
+                    cell_size, h, poly6_coef, stiffness, rest_density):
+        i = cuda.grid(1)
+        if i >= pos.shape[0]:
+            return
+        px = pos[i, 0]
+        py = pos[i, 1]
+        cx = int(px / cell_size)
+        cy = int(py / cell_size)
+        h2 = h * h
+        d = 0.0
+        for ox in range(-1, 2):
+            for oy in range(-1, 2):
+                key = ((cx + ox) << 32) | ((cy + oy) & 0xFFFFFFFF)
+                c = _gpu_find_cell(cell_keys, key)
+                if c < 0:
+                    continue
+                for k in range(cell_start[c], cell_start[c + 1]):
+                    j = sorted_idx[k]
+                    dx = px - pos[j, 0]
+                    dy = py - pos[j, 1]
+                    r2 = dx * dx + dy * dy
+                    if r2 < h2:
+                        w = h2 - r2
+                        d += poly6_coef * w * w * w
+        density[i] = d
+        pressure[i] = stiffness * (d - rest_density)
+
+    @cuda.jit
+    def gpu_forces(pos, vel, density, pressure, acc, cell_keys, cell_start,
+                   sorted_idx, cell_size, h, spiky_coef, visc_coef, viscosity,
+                   gravity_y):
+        i = cuda.grid(1)
+        if i >= pos.shape[0]:
+            return
+        px = pos[i, 0]
+        py = pos[i, 1]
+        cx = int(px / cell_size)
+        cy = int(py / cell_size)
+        h2 = h * h
+        fx = 0.0
+        fy = 0.0
+        for ox in range(-1, 2):
+            for oy in range(-1, 2):
+                key = ((cx + ox) << 32) | ((cy + oy) & 0xFFFFFFFF)
+                c = _gpu_find_cell(cell_keys, key)
+                if c < 0:
+                    continue
+                for k in range(cell_start[c], cell_start[c + 1]):
+                    j = sorted_idx[k]
+                    dx = pos[j, 0] - px
+                    dy = pos[j, 1] - py
+                    r2 = dx * dx + dy * dy
+                    if r2 >= h2 or r2 == 0.0:
+                        continue
+                    r = math.sqrt(r2)
+
+                    # Pressure force
+                    spiky = spiky_coef * (h - r) * (h - r)
+                    term = (pressure[i] + pressure[j]) / (2 * density[j]) * spiky
+                    fx += -dx / r * term
+                    fy += -dy / r * term
+
+                    # Viscosity force
+                    visc = viscosity * visc_coef * (h - r) / density[j]
+                    fx += (vel[j, 0] - vel[i, 0]) * visc
+                    fy += (vel[j, 1] - vel[i, 1]) * visc
+
+        # External forces: gravity and friction, then F -> a
+        fx += -0.1 * vel[i, 0] * density[i]
+        fy += gravity_y * density[i] - 0.1 * vel[i, 1] * density[i]
+        acc[i, 0] = fx / density[i]
+        acc[i, 1] = fy / density[i]
 
 class SpatialGrid:
+    """Compact cell list in CSR layout, keyed by packed 64-bit cell ids.
+
+    Each cell's (ix, iy) indices are packed into one int64 key, so distinct
+    cells never share a bucket the way they could under the hashed table.
+    Particle indices are sorted by key once per update; the particles of
+    occupied cell c are the contiguous slice
+    sorted_idx[cell_start[c]:cell_start[c+1]], with c found by binary search
+    in cell_keys. No dicts, no per-query lists.
+    """
+
     def __init__(self, cell_size):
         self.cell_size = cell_size
-        self.grid = {}
-        
-    def update(self, particles):
-        self.grid = {}
-        for i, p in enumerate(particles):
-            cell = (int(p.pos[0]/self.cell_size), int(p.pos[1]/self.cell_size))
-            if cell not in self.grid:
-                self.grid[cell] = []
-            self.grid[cell].append(i)
-    
+        self.sorted_idx = np.empty(0, dtype=np.int32)
+        self.cell_keys = np.empty(0, dtype=np.int64)
+        self.cell_start = np.zeros(1, dtype=np.int32)
+
+    def pack_keys(self, ix, iy):
+        return (ix << 32) | (iy & 0xFFFFFFFF)
+
+    def update(self, positions):
+        ix = (positions[:, 0] / self.cell_size).astype(np.int64)
+        iy = (positions[:, 1] / self.cell_size).astype(np.int64)
+        keys = self.pack_keys(ix, iy)
+        order = np.argsort(keys, kind='stable')
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        self.sorted_idx = order.astype(np.int32)
+        self.cell_keys = unique_keys
+        self.cell_start = np.concatenate(([0], counts.cumsum())).astype(np.int32)
+
     def get_neighbors(self, pos):
-        cell = (int(pos[0]/self.cell_size), int(pos[1]/self.cell_size))
-        neighbors = []
+        # Bind attributes once; the 9-cell walk below only touches locals
+        cell_size = self.cell_size
+        cell_keys = self.cell_keys
+        cell_start = self.cell_start
+        sorted_idx = self.sorted_idx
+        n_cells = len(cell_keys)
+        cx = int(pos[0] / cell_size)
+        cy = int(pos[1] / cell_size)
+        slices = []
         for dx in (-1, 0, 1):
+            kx = (cx + dx) << 32
             for dy in (-1, 0, 1):
-                adjacent_cell = (cell[0]+dx, cell[1]+dy)
-                if adjacent_cell in self.grid:
-                    neighbors.extend(self.grid[adjacent_cell])
-        return neighbors
-
-class Particle:
-    def __init__(self, pos):
-        self.pos = np.array(pos, dtype=np.float64)
-        self.vel = np.zeros(2, dtype=np.float64)
-        self.acc = np.zeros(2, dtype=np.float64)
-        self.density = REST_DENSITY
-        self.pressure = 0.0
-
-    def update(self, dt):
-        self.vel += self.acc * dt
-        self.pos += self.vel * dt
-        self.acc = np.zeros(2, dtype=np.float64)
+                key = kx | ((cy + dy) & 0xFFFFFFFF)
+                c = np.searchsorted(cell_keys, key)
+                if c < n_cells and cell_keys[c] == key:
+                    slices.append(sorted_idx[cell_start[c]:cell_start[c + 1]])
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int32)
 
 class FluidSimulation:
     def __init__(self, width, height):
         self.width = width
         self.height = height
-        self.particles = []
-        self.grid = SpatialGrid(SMOOTHING_RADIUS)
-        
-        # Initialize particles
-        for _ in range(NUM_PARTICLES):
-            pos = [np.random.uniform(0, width), np.random.uniform(0, height)]
-            self.particles.append(Particle(pos))
-    
+        self.grid = SpatialGrid(H + SKIN)
+
+        # Persistent Verlet pair list and the positions it was built from
+        self.pair_i = None
+        self.pair_j = None
+        self.pair_r = None
+        self.pair_dx = None
+        self.pair_dy = None
+        self.ref_pos = None
+
+        # Particle state as structure-of-arrays
+        rng = np.random.default_rng()
+        self.pos = rng.uniform((0, 0), (width, height),
+                               size=(NUM_PARTICLES, 2)).astype(np.float32)
+        self.vel = np.zeros((NUM_PARTICLES, 2), dtype=np.float32)
+        self.acc = np.zeros((NUM_PARTICLES, 2), dtype=np.float32)
+        self.density = np.full(NUM_PARTICLES, REST_DENSITY, dtype=np.float32)
+        self.pressure = np.zeros(NUM_PARTICLES, dtype=np.float32)
+
+    def integrate(self, dt):
+        self.vel += self.acc * dt
+        self.pos += self.vel * dt
+        self.acc.fill(0.0)
+
     def handle_boundaries(self):
-        for p in self.particles:
-            # Window boundaries with momentum preservation
-            if p.pos[0] < PARTICLE_RADIUS:
-                p.pos[0] = PARTICLE_RADIUS
-                p.vel[0] *= -DAMPING
-            elif p.pos[0] > self.width - PARTICLE_RADIUS:
-                p.pos[0] = self.width - PARTICLE_RADIUS
-                p.vel[0] *= -DAMPING
-                
-            if p.pos[1] < PARTICLE_RADIUS:
-                p.pos[1] = PARTICLE_RADIUS
-                p.vel[1] *= -DAMPING
-            elif p.pos[1] > self.height - PARTICLE_RADIUS:
-                p.pos[1] = self.height - PARTICLE_RADIUS
-                p.vel[1] *= -DAMPING
-    
+        # Window boundaries with momentum preservation: clamp, then flip the
+        # velocity components the clamp touched. No data-dependent branches.
+        low = np.array([PARTICLE_RADIUS, PARTICLE_RADIUS], dtype=self.pos.dtype)
+        high = np.array([self.width - PARTICLE_RADIUS, self.height - PARTICLE_RADIUS],
+                        dtype=self.pos.dtype)
+        clamped = np.clip(self.pos, low, high)
+        bounced = clamped != self.pos
+        np.copyto(self.pos, clamped)
+        self.vel[bounced] *= -DAMPING
+
+    def rebuild_pairs(self):
+        self.grid.update(self.pos)
+        self.pair_i, self.pair_j = build_pairs(
+            self.pos, self.grid.cell_keys, self.grid.cell_start,
+            self.grid.sorted_idx, float(self.grid.cell_size), H + SKIN)
+        n_pairs = len(self.pair_i)
+        self.pair_r = np.empty(n_pairs, dtype=np.float32)
+        self.pair_dx = np.empty(n_pairs, dtype=np.float32)
+        self.pair_dy = np.empty(n_pairs, dtype=np.float32)
+        self.ref_pos = self.pos.copy()
+
     def update_physics(self):
-        # Update spatial grid
-        self.grid.update(self.particles)
-        
-        # Compute densities and pressures
-        for p in self.particles:
-            neighbor_ids = self.grid.get_neighbors(p.pos)
-            neighbors = [self.particles[i] for i in neighbor_ids]
-            
-            density = 0.0
-            for neighbor in neighbors:
-                r = np.linalg.norm(p.pos - neighbor.pos)
-                density += poly6_kernel(r, SMOOTHING_RADIUS)
-            p.density = density
-            p.pressure = PRESSURE_STIFFNESS * (p.density - REST_DENSITY)
-        
-        # Compute forces
-        for p in self.particles:
-            pressure_force = np.zeros(2)
-            viscosity_force = np.zeros(2)
-            
-            neighbor_ids = self.grid.get_neighbors(p.pos)
-            neighbors = [self.particles[i] for i in neighbor_ids]
-            
-            for neighbor in neighbors:
-                if p == neighbor:
-                    continue
-                
-                r_vec = neighbor.pos - p.pos
-                r = np.linalg.norm(r_vec)
-                if r == 0:
-                    continue
-                
-                # Pressure force
-                pressure_force += -r_vec/r * (p.pressure + neighbor.pressure)/(2 * neighbor.density) * \
-                                 spiky_gradient(r, SMOOTHING_RADIUS)
-                
-                # Viscosity force
-                viscosity_force += VISCOSITY * (neighbor.vel - p.vel)/neighbor.density * \
-                                  viscosity_laplacian(r, SMOOTHING_RADIUS)
-            
-            # External forces
-            gravity_force = GRAVITY * p.density
-            friction_force = -0.1 * p.vel * p.density
-            
-            total_force = pressure_force + viscosity_force + gravity_force + friction_force
-            p.acc = total_force / p.density
-    
+        if USE_CUDA:
+            self.update_physics_gpu()
+            return
+
+        # Rebuild the pair list only once accumulated drift could let a
+        # particle cross the skin band
+        if self.ref_pos is None or \
+                ((self.pos - self.ref_pos)**2).sum(axis=1).max() > (0.5 * SKIN)**2:
+            self.rebuild_pairs()
+        refresh_pairs(self.pos, self.pair_i, self.pair_j,
+                      self.pair_r, self.pair_dx, self.pair_dy)
+
+        compute_density(self.density, self.pair_i, self.pair_j, self.pair_r,
+                        H, POLY6_COEF)
+        self.pressure = PRESSURE_STIFFNESS * (self.density - REST_DENSITY)
+
+        compute_forces(self.vel, self.density, self.pressure, self.acc,
+                       self.pair_i, self.pair_j, self.pair_r,
+                       self.pair_dx, self.pair_dy,
+                       H, SPIKY_GRAD_COEF, VISC_LAP_COEF, VISCOSITY,
+                       float(GRAVITY[1]))
+
+    def update_physics_gpu(self):
+        self.grid.update(self.pos)
+
+        pos_d = cuda.to_device(self.pos)
+        vel_d = cuda.to_device(self.vel)
+        density_d = cuda.to_device(self.density)
+        pressure_d = cuda.to_device(self.pressure)
+        acc_d = cuda.to_device(self.acc)
+        cell_keys_d = cuda.to_device(self.grid.cell_keys)
+        cell_start_d = cuda.to_device(self.grid.cell_start)
+        sorted_idx_d = cuda.to_device(self.grid.sorted_idx)
+
+        threads = 128
+        blocks = (NUM_PARTICLES + threads - 1) // threads
+        gpu_density[blocks, threads](
+            pos_d, density_d, pressure_d, cell_keys_d, cell_start_d,
+            sorted_idx_d, float(self.grid.cell_size), H, POLY6_COEF,
+            PRESSURE_STIFFNESS, REST_DENSITY)
+        gpu_forces[blocks, threads](
+            pos_d, vel_d, density_d, pressure_d, acc_d, cell_keys_d,
+            cell_start_d, sorted_idx_d, float(self.grid.cell_size), H,
+            SPIKY_GRAD_COEF, VISC_LAP_COEF, VISCOSITY, float(GRAVITY[1]))
+
+        density_d.copy_to_host(self.density)
+        pressure_d.copy_to_host(self.pressure)
+        acc_d.copy_to_host(self.acc)
+
     def on_resize(self, new_size):
         self.width, self.height = new_size
         # Adjust particles to new boundaries
-        for p in self.particles:
-            p.pos[0] = min(max(p.pos[0], PARTICLE_RADIUS), self.width - PARTICLE_RADIUS)
-            p.pos[1] = min(max(p.pos[1], PARTICLE_RADIUS), self.height - PARTICLE_RADIUS)
+        np.clip(self.pos[:, 0], PARTICLE_RADIUS, self.width - PARTICLE_RADIUS,
+                out=self.pos[:, 0])
+        np.clip(self.pos[:, 1], PARTICLE_RADIUS, self.height - PARTICLE_RADIUS,
+                out=self.pos[:, 1])
+
+class GLParticleRenderer:
+    """Draws the particle array as anti-aliased point sprites via moderngl.
+
+    Positions are uploaded once per frame into a dynamic VBO (8 bytes per
+    particle); the circle shape is evaluated in the fragment shader from
+    gl_PointCoord, so there is no per-particle work on the Python side.
+    """
+
+    VERTEX_SHADER = """
+        #version 330
+        uniform vec2 u_resolution;
+        uniform float u_point_size;
+        in vec2 in_pos;
+        void main() {
+            vec2 ndc = in_pos / u_resolution * 2.0 - 1.0;
+            gl_Position = vec4(ndc.x, -ndc.y, 0.0, 1.0);
+            gl_PointSize = u_point_size;
+        }
+    """
+
+    FRAGMENT_SHADER = """
+        #version 330
+        uniform vec3 u_color;
+        out vec4 frag_color;
+        void main() {
+            float r = length(gl_PointCoord - vec2(0.5)) * 2.0;
+            float alpha = 1.0 - smoothstep(0.9, 1.0, r);
+            if (alpha <= 0.0)
+                discard;
+            frag_color = vec4(u_color, alpha);
+        }
+    """
+
+    def __init__(self, size):
+        self.ctx = moderngl.create_context()
+        self.ctx.enable(moderngl.BLEND | moderngl.PROGRAM_POINT_SIZE)
+        self.prog = self.ctx.program(vertex_shader=self.VERTEX_SHADER,
+                                     fragment_shader=self.FRAGMENT_SHADER)
+        self.prog['u_color'].value = tuple(c / 255 for c in PARTICLE_COLOR)
+        self.prog['u_point_size'].value = float(2 * PARTICLE_RADIUS)
+        self.vbo = self.ctx.buffer(reserve=NUM_PARTICLES * 8, dynamic=True)
+        self.vao = self.ctx.vertex_array(self.prog, [(self.vbo, '2f', 'in_pos')])
+        self.on_resize(size)
+
+    def on_resize(self, size):
+        self.ctx.viewport = (0, 0, size[0], size[1])
+        self.prog['u_resolution'].value = (float(size[0]), float(size[1]))
+
+    def draw(self, pos):
+        self.ctx.clear(*(c / 255 for c in BACKGROUND_COLOR))
+        self.vbo.write(pos.tobytes())
+        self.vao.render(mode=moderngl.POINTS, vertices=NUM_PARTICLES)
 
 def main():
     pygame.init()
-    screen = pygame.display.set_mode(WINDOW_SIZE, HWSURFACE|DOUBLEBUF|RESIZABLE)
+    display_flags = DOUBLEBUF | RESIZABLE
+    display_flags |= OPENGL if HAVE_MODERNGL else HWSURFACE
+    screen = pygame.display.set_mode(WINDOW_SIZE, display_flags)
     clock = pygame.time.Clock()
-    
+
     sim = FluidSimulation(*WINDOW_SIZE)
-    
+
+    if HAVE_MODERNGL:
+        renderer = GLParticleRenderer(WINDOW_SIZE)
+        sprite = None
+    else:
+        renderer = None
+        # Pre-render one particle sprite; per-frame drawing is a single batched
+        # blit of N copies instead of N pygame.draw.circle calls into SDL.
+        sprite = pygame.Surface((2*PARTICLE_RADIUS, 2*PARTICLE_RADIUS), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, PARTICLE_COLOR,
+                           (PARTICLE_RADIUS, PARTICLE_RADIUS), PARTICLE_RADIUS)
+
     running = True
+    active = True
+    accumulator = 0.0
     while running:
+        frame_dt = clock.tick(60) / 1000.0
         for event in pygame.event.get():
             if event.type == QUIT:
                 running = False
             elif event.type == VIDEORESIZE:
-                screen = pygame.display.set_mode(event.size, HWSURFACE|DOUBLEBUF|RESIZABLE)
+                screen = pygame.display.set_mode(event.size, display_flags)
                 sim.on_resize(event.size)
-        
-        # Physics steps
-        sim.update_physics()
-        for p in sim.particles:
-            p.update(TIME_STEP)
-        sim.handle_boundaries()
-        
+                if renderer is not None:
+                    renderer.on_resize(event.size)
+            elif event.type == WINDOWMINIMIZED:
+                active = False
+            elif event.type == WINDOWRESTORED:
+                active = True
+
+        # Skip physics and rendering entirely while minimized
+        if not active:
+            continue
+
+        # Physics at a fixed 60 Hz, decoupled from the render rate; the cap
+        # keeps a long resize/drag stall from spiraling into a catch-up burst
+        accumulator = min(accumulator + frame_dt, 5 * TIME_STEP)
+        while accumulator >= TIME_STEP:
+            sim.update_physics()
+            sim.integrate(TIME_STEP)
+            sim.handle_boundaries()
+            accumulator -= TIME_STEP
+
         # Rendering
-        screen.fill(BACKGROUND_COLOR)
-        for p in sim.particles:
-            pygame.draw.circle(screen, PARTICLE_COLOR, 
-                             (int(p.pos[0]), int(p.pos[1])), PARTICLE_RADIUS)
-        
+        if renderer is not None:
+            renderer.draw(sim.pos)
+        else:
+            screen.fill(BACKGROUND_COLOR)
+            offsets = (sim.pos - PARTICLE_RADIUS).astype(int)
+            screen.blits([(sprite, (x, y)) for x, y in offsets])
+
         pygame.display.flip()
-        clock.tick(60)
-    
+
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,7 +1,7 @@
 import pygame
 import math
-import random
 import numpy as np
+from numba import njit
 
 # Constants
 NUM_PARTICLES = 100
@@ -21,6 +21,13 @@ VISCOSITY_STRENGTH = 1.0
 SURFACE_TENSION = 0.05
 EPSILON = 1e-8  # Numerical safety margin
 
+# Precomputed smoothing-kernel coefficients (h = SMOOTHING_RADIUS)
+H = SMOOTHING_RADIUS
+H2 = H * H
+POLY6_COEF = 315.0 / (64.0 * math.pi * H**9)
+SPIKY_GRAD_COEF = -45.0 / (math.pi * H**6)
+VISC_COEF = 15.0 / (2.0 * math.pi * H**3)
+
 class Particle:
     def __init__(self, x, y):
         self.x = x
@@ -38,95 +45,162 @@ class Particle:
         self.ax += fx / self.mass
         self.ay += fy / self.mass
 
-def sph_kernel(r, h):
-    return 315 / (64 * np.pi * h**9) * (h**2 - r**2)**3 if r < h else 0
+@njit(fastmath=True, cache=True)
+def sph_kernel(r):
+    # Branchless: the max() clamp zeroes the kernel beyond the support radius
+    return POLY6_COEF * max(H2 - r*r, 0.0)**3
 
-def sph_kernel_derivative(r, h):
-    return -45 / (np.pi * h**6) * (h - r)**2 if r < h else 0
+@njit(fastmath=True, cache=True)
+def sph_kernel_derivative(r):
+    return SPIKY_GRAD_COEF * max(H - r, 0.0)**2
 
-def sph_viscosity_kernel(r, h):
+@njit(fastmath=True, cache=True)
+def sph_viscosity_kernel(r):
     """Numerically stable viscosity kernel"""
-    if r < EPSILON:
+    if r < EPSILON or r >= H:
         return 0.0
-    return (15 / (2 * np.pi * h**3)) * (
-        - (r**3) / (2*h**3) + 
-        r**2 / h**2 + 
-        h / (2*(r + EPSILON)) -  # Prevent division by zero
+    return VISC_COEF * (
+        - (r**3) / (2*H*H2) +
+        r*r / H2 +
+        H / (2*(r + EPSILON)) -  # Prevent division by zero
         1
-    ) if r < h else 0
+    )
 
-def find_neighbors(particles, h):
-    neighbors = [[] for _ in particles]
-    for i, p1 in enumerate(particles):
-        for j, p2 in enumerate(particles[i+1:], i+1):
-            dx = p2.x - p1.x
-            dy = p2.y - p1.y
-            r = math.hypot(dx, dy)
-            if r < h:
-                neighbors[i].append((j, r))
-                neighbors[j].append((i, r))
-    return neighbors
-
-def compute_density_pressure(particles, neighbors, h):
-    for i, p in enumerate(particles):
-        density = 0.0
-        for j, r in neighbors[i]:
-            density += particles[j].mass * sph_kernel(r, h)
-        p.density = max(density, REST_DENSITY*0.1)  # Prevent negative pressure
-        p.pressure = PRESSURE_STIFFNESS * (p.density - REST_DENSITY)
-
-def compute_forces(particles, neighbors, h):
-    for i, p in enumerate(particles):
-        pressure_force_x = 0.0
-        pressure_force_y = 0.0
-        viscosity_force_x = 0.0
-        viscosity_force_y = 0.0
-        tension_force_x = 0.0
-        tension_force_y = 0.0
-        
-        for j, r in neighbors[i]:
-            pj = particles[j]
-            dx = pj.x - p.x
-            dy = pj.y - p.y
-            distance = max(r, EPSILON)  # Ensure non-zero distance
-            dir_x = dx / distance
-            dir_y = dy / distance
-            
-            # Pressure force
-            shared_pressure = (p.pressure + pj.pressure) / 2
-            pressure_force = -shared_pressure * sph_kernel_derivative(r, h)
-            pressure_force_x += pressure_force * dir_x
-            pressure_force_y += pressure_force * dir_y
-            
-            # Viscosity force
-            vel_diff_x = pj.vx - p.vx
-            vel_diff_y = pj.vy - p.vy
-            viscosity = VISCOSITY_STRENGTH * sph_viscosity_kernel(r, h)
-            viscosity_force_x += viscosity * vel_diff_x
-            viscosity_force_y += viscosity * vel_diff_y
-            
-            # Surface tension
-            cohesion = sph_kernel(r, h) * SURFACE_TENSION
-            tension_force_x += cohesion * dir_x
-            tension_force_y += cohesion * dir_y
-        
-        # Apply forces
-        p.apply_force(pressure_force_x, pressure_force_y)
-        p.apply_force(viscosity_force_x, viscosity_force_y)
-        p.apply_force(tension_force_x, tension_force_y)
-
-def handle_collisions(particles):
-    for i in range(len(particles)):
-        for j in range(i+1, len(particles)):
+@njit(cache=True)
+def morton_code(ix, iy):
+    """Interleave two 16-bit cell indices into a Z-order (Morton) code."""
+    x = ix & 0xFFFF
+    x = (x | (x << 8)) & 0x00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F
+    x = (x | (x << 2)) & 0x33333333
+    x = (x | (x << 1)) & 0x55555555
+    y = iy & 0xFFFF
+    y = (y | (y << 8)) & 0x00FF00FF
+    y = (y | (y << 4)) & 0x0F0F0F0F
+    y = (y | (y << 2)) & 0x33333333
+    y = (y | (y << 1)) & 0x55555555
+    return x | (y << 1)
+
+@njit(fastmath=True, cache=True)
+def find_neighbors(x, y, h):
+    """Collect interacting pairs as flat (pair_i, pair_j, pair_r) arrays.
+
+    Particles are bucketed into h-sized cells, sorted by the Morton code of
+    their cell, and each particle only scans the 9 surrounding cells; a
+    cell's particles are found with two binary searches into the sorted
+    codes instead of a dict lookup.
+    """
+    n = x.shape[0]
+    ix = np.empty(n, dtype=np.int64)
+    iy = np.empty(n, dtype=np.int64)
+    codes = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        ix[i] = int(x[i] / h)
+        iy[i] = int(y[i] / h)
+        codes[i] = morton_code(ix[i], iy[i])
+    order = np.argsort(codes)
+    codes_sorted = codes[order]
+
+    max_pairs = n * (n - 1) // 2
+    pair_i = np.empty(max_pairs, dtype=np.int32)
+    pair_j = np.empty(max_pairs, dtype=np.int32)
+    pair_r = np.empty(max_pairs, dtype=np.float64)
+    count = 0
+    h2 = h * h
+    for i in range(n):
+        for ox in range(-1, 2):
+            cx = ix[i] + ox
+            if cx < 0:
+                continue
+            for oy in range(-1, 2):
+                cy = iy[i] + oy
+                if cy < 0:
+                    continue
+                code = morton_code(cx, cy)
+                lo = np.searchsorted(codes_sorted, code)
+                hi = np.searchsorted(codes_sorted, code, side='right')
+                for k in range(lo, hi):
+                    j = order[k]
+                    if j <= i:
+                        continue
+                    dx = x[j] - x[i]
+                    dy = y[j] - y[i]
+                    r2 = dx*dx + dy*dy
+                    if r2 < h2:
+                        pair_i[count] = i
+                        pair_j[count] = j
+                        pair_r[count] = math.sqrt(r2)
+                        count += 1
+    return pair_i[:count], pair_j[:count], pair_r[:count]
+
+@njit(fastmath=True, cache=True)
+def compute_density_pressure(mass, density, pressure, pair_i, pair_j, pair_r):
+    n = density.shape[0]
+    density[:] = 0.0
+    for k in range(pair_i.shape[0]):
+        i = pair_i[k]
+        j = pair_j[k]
+        w = sph_kernel(pair_r[k])
+        density[i] += mass[j] * w
+        density[j] += mass[i] * w
+    for i in range(n):
+        if density[i] < REST_DENSITY * 0.1:  # Prevent negative pressure
+            density[i] = REST_DENSITY * 0.1
+        pressure[i] = PRESSURE_STIFFNESS * (density[i] - REST_DENSITY)
+
+@njit(fastmath=True, cache=True)
+def compute_forces(x, y, vx, vy, mass, density, pressure, ax, ay,
+                   pair_i, pair_j, pair_r):
+    for k in range(pair_i.shape[0]):
+        i = pair_i[k]
+        j = pair_j[k]
+        r = pair_r[k]
+        dx = x[j] - x[i]
+        dy = y[j] - y[i]
+        distance = max(r, EPSILON)  # Ensure non-zero distance
+        dir_x = dx / distance
+        dir_y = dy / distance
+
+        # Pressure force
+        shared_pressure = (pressure[i] + pressure[j]) / 2
+        pressure_force = -shared_pressure * sph_kernel_derivative(r)
+        fx = pressure_force * dir_x
+        fy = pressure_force * dir_y
+
+        # Viscosity force
+        viscosity = VISCOSITY_STRENGTH * sph_viscosity_kernel(r)
+        fx += viscosity * (vx[j] - vx[i])
+        fy += viscosity * (vy[j] - vy[i])
+
+        # Surface tension
+        cohesion = sph_kernel(r) * SURFACE_TENSION
+        fx += cohesion * dir_x
+        fy += cohesion * dir_y
+
+        # Equal and opposite contributions on both pair members
+        ax[i] += fx / mass[i]
+        ay[i] += fy / mass[i]
+        ax[j] -= fx / mass[j]
+        ay[j] -= fy / mass[j]
+
+def handle_collisions(particles, _sqrt=math.sqrt):
+    # Bind globals once: _sqrt via the default arg shortcut, the rest as
+    # locals, so the O(N^2) pair loop does no LOAD_GLOBAL lookups
+    n = len(particles)
+    eps_sq = EPSILON * EPSILON
+    for i in range(n):
+        for j in range(i+1, n):
             p1 = particles[i]
             p2 = particles[j]
-            
+
             dx = p2.x - p1.x
             dy = p2.y - p1.y
-            distance = math.hypot(dx, dy)
+            dist_sq = dx*dx + dy*dy
             min_dist = p1.radius + p2.radius
-            
-            if distance < min_dist and distance > EPSILON:
+
+            # Compare squared distances; only pay for the sqrt on overlap
+            if eps_sq < dist_sq < min_dist*min_dist:
+                distance = _sqrt(dist_sq)
                 # Collision resolution with positional correction
                 nx = dx / distance
                 ny = dy / distance
@@ -155,21 +229,34 @@ def main():
     pygame.display.set_caption("SPH Fluid Simulation (Stable)")
     clock = pygame.time.Clock()
     
-    particles = [
-        Particle(
-            random.uniform(PARTICLE_RADIUS, width - PARTICLE_RADIUS),
-            random.uniform(PARTICLE_RADIUS, height - PARTICLE_RADIUS)
-        ) for _ in range(NUM_PARTICLES)
-    ]
+    # Draw all spawn positions in one batched RNG call
+    spawn = np.random.default_rng().uniform(
+        (PARTICLE_RADIUS, PARTICLE_RADIUS),
+        (width - PARTICLE_RADIUS, height - PARTICLE_RADIUS),
+        size=(NUM_PARTICLES, 2))
+    particles = [Particle(px, py) for px, py in spawn]
+
+    # Constant masses and reusable kernel buffers, allocated once
+    n = len(particles)
+    mass = np.array([p.mass for p in particles])
+    density = np.empty(n)
+    pressure = np.empty(n)
+    ax = np.zeros(n)
+    ay = np.zeros(n)
     
     running = True
+    active = True
     while running:
         dt = clock.tick(60) / 1000.0  # Cap at 60 FPS
-        
+
         # Event handling
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.WINDOWMINIMIZED:
+                active = False
+            elif event.type == pygame.WINDOWRESTORED:
+                active = True
             elif event.type == pygame.VIDEORESIZE:
                 new_width, new_height = event.w, event.h
                 for p in particles:
@@ -177,11 +264,29 @@ def main():
                     p.y = max(PARTICLE_RADIUS, min(p.y, new_height - PARTICLE_RADIUS))
                 width, height = new_width, new_height
                 screen = pygame.display.set_mode((width, height), pygame.RESIZABLE)
-        
+
+        # Skip simulation and rendering entirely while minimized
+        if not active:
+            continue
+
+        # Pack mutable particle state for the JIT kernels
+        x = np.array([p.x for p in particles])
+        y = np.array([p.y for p in particles])
+        vx = np.array([p.vx for p in particles])
+        vy = np.array([p.vy for p in particles])
+        ax[:] = 0.0
+        ay[:] = 0.0
+
         # SPH simulation steps
-        neighbors = find_neighbors(particles, SMOOTHING_RADIUS)
-        compute_density_pressure(particles, neighbors, SMOOTHING_RADIUS)
-        compute_forces(particles, neighbors, SMOOTHING_RADIUS)
+        pair_i, pair_j, pair_r = find_neighbors(x, y, SMOOTHING_RADIUS)
+        compute_density_pressure(mass, density, pressure,
+                                 pair_i, pair_j, pair_r)
+        compute_forces(x, y, vx, vy, mass, density, pressure, ax, ay,
+                       pair_i, pair_j, pair_r)
+        for i, p in enumerate(particles):
+            p.density = density[i]
+            p.pressure = pressure[i]
+            p.apply_force(ax[i] * p.mass, ay[i] * p.mass)
         
         # Apply gravity
         for p in particles:
@@ -1,6 +1,8 @@
 import pygame
 import random
 import math
+import numpy as np
+from scipy.spatial import cKDTree
 
 # ---------------------
 # CONFIGURABLE CONSTANTS
@@ -42,57 +44,63 @@ class Ball:
 # COLLISION FUNCTIONS
 # ---------------------
 def handle_ball_collisions(balls):
-    """ Naive O(n^2) collision check between balls. """
-    for i in range(len(balls)):
-        for j in range(i+1, len(balls)):
-            dx = balls[j].x - balls[i].x
-            dy = balls[j].y - balls[i].y
-            dist_sq = dx*dx + dy*dy
-            # If overlapping
-            if dist_sq < (2*BALL_RADIUS)**2:
-                dist = math.sqrt(dist_sq) if dist_sq != 0 else 0.0001
-                # Normalized collision vector
-                nx = dx / dist
-                ny = dy / dist
-                # Overlap correction (push them apart)
-                overlap = (2*BALL_RADIUS - dist) * 0.5
-                balls[i].x -= nx * overlap
-                balls[i].y -= ny * overlap
-                balls[j].x += nx * overlap
-                balls[j].y += ny * overlap
-
-                # Basic elastic collision response (1D along normal)
-                rel_vx = balls[j].vx - balls[i].vx
-                rel_vy = balls[j].vy - balls[i].vy
-                sep_speed = rel_vx * nx + rel_vy * ny
-                # Only separate if moving closer
-                if sep_speed < 0:
-                    imp = -(1 + ELASTICITY) * sep_speed / 2
-                    ix = imp * nx
-                    iy = imp * ny
-                    # Apply impulses
-                    balls[i].vx -= ix
-                    balls[i].vy -= iy
-                    balls[j].vx += ix
-                    balls[j].vy += iy
+    """ KD-tree collision check between balls: only overlapping pairs are visited. """
+    pos = np.array([(b.x, b.y) for b in balls])
+    vel = np.array([(b.vx, b.vy) for b in balls])
+
+    pairs = cKDTree(pos).query_pairs(2*BALL_RADIUS, output_type='ndarray')
+    if len(pairs) == 0:
+        return
+    i = pairs[:, 0]
+    j = pairs[:, 1]
+
+    delta = pos[j] - pos[i]
+    dist = np.hypot(delta[:, 0], delta[:, 1])
+    dist = np.where(dist == 0, 0.0001, dist)
+    # Normalized collision vectors
+    normal = delta / dist[:, None]
+
+    # Overlap correction (push them apart)
+    overlap = (2*BALL_RADIUS - dist) * 0.5
+    correction = normal * overlap[:, None]
+    np.add.at(pos, i, -correction)
+    np.add.at(pos, j, correction)
+
+    # Basic elastic collision response (1D along normal);
+    # only separate if moving closer
+    rel_v = vel[j] - vel[i]
+    sep_speed = (rel_v * normal).sum(axis=1)
+    imp = np.where(sep_speed < 0, -(1 + ELASTICITY) * sep_speed / 2, 0.0)
+    impulse = normal * imp[:, None]
+    np.add.at(vel, i, -impulse)
+    np.add.at(vel, j, impulse)
+
+    for k, b in enumerate(balls):
+        b.x, b.y = pos[k]
+        b.vx, b.vy = vel[k]
 
 def handle_wall_collisions(balls, width, height):
+    # Hoist globals and bound computations out of the per-ball loop
+    radius = BALL_RADIUS
+    elasticity = ELASTICITY
+    right = width - radius
+    bottom = height - radius
     for b in balls:
         # Check left/right walls
-        if b.x < BALL_RADIUS:
-            b.x = BALL_RADIUS
-            b.vx = -b.vx * ELASTICITY
-        elif b.x > width - BALL_RADIUS:
-            b.x = width - BALL_RADIUS
-            b.vx = -b.vx * ELASTICITY
+        if b.x < radius:
+            b.x = radius
+            b.vx = -b.vx * elasticity
+        elif b.x > right:
+            b.x = right
+            b.vx = -b.vx * elasticity
 
         # Check top/bottom walls
-        if b.y < BALL_RADIUS:
-            b.y = BALL_RADIUS
-            b.vy = -b.vy * ELASTICITY
-        elif b.y > height - BALL_RADIUS:
-            b.y = height - BALL_RADIUS
-            b.vy = -b.vy * ELASTICITY
+        if b.y < radius:
+            b.y = radius
+            b.vy = -b.vy * elasticity
+        elif b.y > bottom:
+            b.y = bottom
+            b.vy = -b.vy * elasticity
 
 # ---------------------
 # MAIN SIMULATION
@@ -115,12 +123,17 @@ def main():
     current_width, current_height = SCREEN_WIDTH, SCREEN_HEIGHT
 
     running = True
+    active = True
     while running:
         clock.tick(60)  # Limit FPS
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.WINDOWMINIMIZED:
+                active = False
+            elif event.type == pygame.WINDOWRESTORED:
+                active = True
             elif event.type == pygame.VIDEORESIZE:
                 # Rescale positions to fit new window size
                 new_width, new_height = event.w, event.h
@@ -135,6 +148,10 @@ def main():
                 current_width, current_height = new_width, new_height
                 screen = pygame.display.set_mode((new_width, new_height), pygame.RESIZABLE)
 
+        # Skip simulation and rendering entirely while minimized
+        if not active:
+            continue
+
         # Update physics
         for b in balls:
             b.update()
@@ -0,0 +1,17 @@
+"""Builds the optional Cython fast path for combined.py:
+
+    python setup.py build_ext --inplace
+"""
+from setuptools import Extension, setup
+from Cython.Build import cythonize
+
+extensions = [
+    Extension(
+        "sph_core",
+        ["sph_core.pyx"],
+        extra_compile_args=["-O3", "-ffast-math", "-march=native", "-fopenmp"],
+        extra_link_args=["-fopenmp"],
+    )
+]
+
+setup(name="sph_core", ext_modules=cythonize(extensions))